@@ -1,33 +1,60 @@
 import os
-import openai
-from dotenv import load_dotenv
+import asyncio
+import functools
 
-# Load environment variables from .env file
-load_dotenv()
-
-# Get the API key from environment variables
-api_key = os.getenv("OPENAI_API_KEY")
-
-# Initialize the OpenAI client with the API key
-client = openai.OpenAI(api_key=api_key)
+# Limit concurrent requests to stay within the API rate limits
+MAX_CONCURRENT_REQUESTS = 5
 
 # Define the prompt for the poem
 prompt = "Write a short, beautiful poem about AI tinkerers and the best meetup for AI engineers in the world."
 
-# Generate the poem using the OpenAI API
-response = client.chat.completions.create(
-    model="gpt-4o",
-    messages=[
-        {"role": "system", "content": "You are a creative poet who writes beautiful, concise poems."},
-        {"role": "user", "content": prompt}
-    ],
-    max_tokens=300
-)
-
-# Extract the poem from the response
-poem = response.choices[0].message.content
-
-# Print the poem
-print("\n--- AI-Generated Poem ---\n")
-print(poem)
-print("\n-------------------------\n") 
\ No newline at end of file
+@functools.lru_cache(maxsize=1)
+def _create_client(loop: asyncio.AbstractEventLoop):
+    """Create the OpenAI client, importing the SDK only when a poem is requested."""
+    import openai
+    from dotenv import load_dotenv
+
+    # Load environment variables from .env file
+    load_dotenv()
+
+    # Get the API key from environment variables
+    api_key = os.getenv("OPENAI_API_KEY")
+    return openai.AsyncOpenAI(api_key=api_key)
+
+def get_client():
+    """Return the OpenAI client for the running event loop, reusing its connection pool."""
+    # The async client's connections are tied to the loop they were opened on
+    return _create_client(asyncio.get_running_loop())
+
+async def generate(prompts: list[str]) -> list[str]:
+    """Generate one poem per prompt, running the requests concurrently."""
+    client = get_client()
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+    async def generate_one(prompt: str) -> str:
+        async with semaphore:
+            # Generate the poem using the OpenAI API
+            response = await client.chat.completions.create(
+                model="gpt-4o",
+                messages=[
+                    {"role": "system", "content": "You are a creative poet who writes beautiful, concise poems."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=300
+            )
+        # Extract the poem from the response
+        return response.choices[0].message.content
+
+    return await asyncio.gather(*(generate_one(p) for p in prompts))
+
+def main():
+    """Generate and print a single poem."""
+    poem = asyncio.run(generate([prompt]))[0]
+
+    # Print the poem
+    print("\n--- AI-Generated Poem ---\n")
+    print(poem)
+    print("\n-------------------------\n")
+
+if __name__ == "__main__":
+    main()
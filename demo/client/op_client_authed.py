@@ -3,36 +3,268 @@ import sys
 import asyncio
 import logging
 import base64
-import traceback
+import functools
+import math
+import random
+import time
+from dataclasses import dataclass
 from typing import List, Dict, Any, Optional
 from contextlib import AsyncExitStack
 
-from authed.sdk import Authed
-from mcp import ClientSession
-from mcp.client.sse import sse_client
-from dotenv import load_dotenv
-import httpx
+import anyio
+import orjson
+from dotenv import find_dotenv
 
-load_dotenv()
+# The env and logging helpers are shared with the server, in the demo directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from env import load_env
+from logging_setup import setup_logging
+
+# Load the nearest .env at or above this directory, if there is one
+dotenv_path = find_dotenv()
+if dotenv_path:
+    load_env(dotenv_path)
 
 # Load environment variables from .env file
-dotenv_path = os.path.join(os.path.dirname(__file__), '..', 'server', '.env')
-if os.path.exists(dotenv_path):
-    load_dotenv(dotenv_path)
-    print(f"Loaded environment variables from {dotenv_path}")
-else:
-    print(f"Warning: .env file not found at {dotenv_path}")
+load_env(os.path.join(os.path.dirname(__file__), '..', 'server', '.env'))
+
+logger = logging.getLogger(__name__)
 
-# Set up more detailed logging
-logging.basicConfig(
-    level=logging.DEBUG,
+# Upper bound for the keep-alive interval while pings keep failing
+KEEPALIVE_MAX_BACKOFF = 240.0
+
+class AsyncTTLCache:
+    """Cache coroutine results per key for a fixed number of seconds."""
+    
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[Any, Any] = {}
+        # Fetches in progress, so concurrent misses on one key share a single fetch
+        self._inflight: Dict[Any, asyncio.Task] = {}
+    
+    def _get(self, key: Any) -> Any:
+        entry = self._entries.get(key)
+        if entry and time.monotonic() < entry[0]:
+            return entry
+        return None
+    
+    def put(self, key: Any, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+    
+    async def get(self, key: Any, fetch) -> Any:
+        """Return the cached value for key, awaiting fetch() to refresh it when expired."""
+        entry = self._get(key)
+        if entry:
+            return entry[1]
+        
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(key, fetch))
+            self._inflight[key] = task
+        # A caller giving up must not cancel the fetch the others are waiting on
+        return await asyncio.shield(task)
+    
+    async def _fetch(self, key: Any, fetch) -> Any:
+        try:
+            value = await fetch()
+            self.put(key, value)
+            return value
+        finally:
+            del self._inflight[key]
+
+@dataclass(frozen=True)
+class ClientConfig:
+    """Settings for OnePasswordAuthedClient, read from the environment."""
+    registry_url: Optional[str]
+    agent_id: Optional[str]
+    agent_secret: Optional[str]
+    private_key: Optional[str]
+    public_key: Optional[str]
+    target_agent_id: Optional[str]
+    server_url: str
+    max_concurrent_calls: int
+    # Idle time after which a ping is sent to keep the SSE connection open
+    keepalive_interval: float
+    # How long vault and item listings are reused before they are fetched again
+    list_cache_ttl: float
+
+@functools.lru_cache(maxsize=1)
+def load_config() -> ClientConfig:
+    """Read the client settings once, after the .env files have been loaded."""
+    env = os.environ
+    return ClientConfig(
+        registry_url=env.get("AUTHED_REGISTRY_URL"),
+        agent_id=env.get("AUTHED_AGENT_ID"),
+        agent_secret=env.get("AUTHED_AGENT_SECRET"),
+        private_key=env.get("AUTHED_PRIVATE_KEY"),
+        public_key=env.get("AUTHED_PUBLIC_KEY"),
+        target_agent_id=env.get("TARGET_AGENT_ID"),
+        server_url=env.get("OP_SERVICE_URL", "http://localhost:8000/sse"),
+        max_concurrent_calls=int(env.get("OP_MAX_CONCURRENT_CALLS", "32")),
+        keepalive_interval=float(env.get("OP_KEEPALIVE_INTERVAL", "15")),
+        list_cache_ttl=float(env.get("OP_LIST_CACHE_TTL", "60")),
+    )
+
+# Set up more detailed logging; read directly so that importing this module
+# does not freeze the client settings before a caller has loaded its own .env
+setup_logging(
+    level=os.getenv("LOG_LEVEL", "DEBUG").upper(),
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 # Reduce noise from other libraries
 logging.getLogger("httpx").setLevel(logging.INFO)
 logging.getLogger("httpcore").setLevel(logging.INFO)
 
-logger = logging.getLogger(__name__)
+@functools.lru_cache(maxsize=None)
+def _get_authed(registry_url: str, agent_id: str, agent_secret: str,
+                private_key: Optional[str], public_key: Optional[str]):
+    """Initialize the Authed SDK once per set of agent credentials."""
+    # Imported lazily to keep module import cheap
+    from authed.sdk import Authed
+    
+    logger.info("Initializing Authed SDK...")
+    authed = Authed.initialize(
+        registry_url=registry_url,
+        agent_id=agent_id,
+        agent_secret=agent_secret,
+        private_key=private_key,
+        public_key=public_key
+    )
+    logger.info("Authed SDK initialized successfully")
+    return authed
+
+# Timeouts, in seconds, for each kind of request to the 1Password service
+TIMEOUTS = {
+    "connect": 30.0,
+    "sse_read": 120.0,
+    "tool_call": 10.0,
+    "list": 5.0,
+    "read": 5.0,
+}
+
+# Single listings are quick; anything fanning out over vaults gets the tool-call timeout
+_LIST_TOOLS = frozenset({"onepassword_list_vaults", "onepassword_list_items"})
+
+def _tool_timeout(name: str) -> float:
+    """Pick the timeout for a tool call, allowing listings less time than other calls."""
+    return TIMEOUTS["list"] if name in _LIST_TOOLS else TIMEOUTS["tool_call"]
+
+# Connection attempts per reconnect, and how long to stop trying after repeated failures
+CONNECT_MAX_TRIES = 5
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_AFTER = 30.0
+# Sessions that close sooner than this after opening count as failed connection attempts
+SESSION_MIN_LIFETIME = 5.0
+
+class CircuitBreaker:
+    """Fail fast for a while after repeated failures instead of hammering an unreachable server."""
+    
+    def __init__(self, threshold: int = CIRCUIT_FAILURE_THRESHOLD, reset_after: float = CIRCUIT_RESET_AFTER):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self._failures = 0
+        self._open_until = 0.0
+    
+    def check(self):
+        """Raise if the circuit is open."""
+        remaining = self._open_until - time.monotonic()
+        if remaining > 0:
+            raise ValueError(f"Service unavailable, not retrying for another {remaining:.0f}s")
+    
+    def record_success(self):
+        self._failures = 0
+    
+    def record_failure(self):
+        self._failures += 1
+        if self._failures >= self.threshold:
+            logger.warning("%d consecutive failures, pausing attempts for %.0fs", self._failures, self.reset_after)
+            self._open_until = time.monotonic() + self.reset_after
+            self._failures = 0
+
+async def with_backoff(fn, base: float = 0.5, cap: float = 30.0, max_tries: int = CONNECT_MAX_TRIES,
+                       breaker: Optional[CircuitBreaker] = None) -> Any:
+    """
+    Await fn(), retrying failures with jittered exponential back-off.
+    
+    Args:
+        fn: Coroutine function to call
+        base: Delay before the first retry, in seconds
+        cap: Longest delay between retries, in seconds
+        max_tries: Attempts before the last error is raised
+        breaker: Circuit breaker that short-circuits attempts while open
+        
+    Returns:
+        The result of the first successful call
+    """
+    for attempt in range(max_tries):
+        if breaker:
+            breaker.check()
+        try:
+            result = await fn()
+        except Exception as e:
+            if breaker:
+                breaker.record_failure()
+            if attempt == max_tries - 1:
+                raise
+            delay = min(cap, base * 2 ** attempt) + random.uniform(0, 0.5)
+            logger.debug("Attempt %d/%d failed (%s), retrying in %.1fs", attempt + 1, max_tries, e, delay)
+            await asyncio.sleep(delay)
+        else:
+            if breaker:
+                breaker.record_success()
+            return result
+
+def _required_arguments(tools: List[Any]) -> Dict[str, frozenset]:
+    """Map each tool name to the argument names its input schema requires."""
+    return {tool.name: frozenset(tool.inputSchema.get("required", ())) for tool in tools}
+
+def _content_texts(content: Any) -> Optional[List[str]]:
+    """Return the text of each TextContent in a tool result, or None if it is already parsed."""
+    if hasattr(content, 'text'):  # If content is a single TextContent
+        return [content.text]
+    if isinstance(content, list) and content and all(hasattr(c, 'text') for c in content):
+        return [c.text for c in content]
+    return None
+
+def _parse_list_content(content: Any, kind: str) -> List[Dict[str, str]]:
+    """Parse a tool result whose TextContent items hold JSON objects or lists into one list."""
+    texts = _content_texts(content)
+    if texts is None:
+        # Just return the content as-is if it's already a list
+        logger.info("Content is already parsed: %s", type(content))
+        return content
+    
+    parsed = []
+    for json_str in texts:
+        logger.debug("Parsing JSON from TextContent: %s", json_str)
+        value = orjson.loads(json_str)
+        # Make sure we got a list (if it's a single item, wrap it)
+        if isinstance(value, list):
+            parsed.extend(value)
+        else:
+            parsed.append(value)
+    
+    logger.info("Successfully parsed %d %s", len(parsed), kind)
+    return parsed
+
+def _parse_value_content(content: Any) -> Any:
+    """Parse a tool result holding a single JSON or plain-text value."""
+    texts = _content_texts(content)
+    if texts is None or len(texts) != 1:
+        # Just return the content as-is
+        logger.info("Content is already parsed: %s", type(content))
+        return content
+    
+    json_str = texts[0]
+    logger.debug("Parsing JSON from TextContent: %s", json_str)
+    try:
+        value = orjson.loads(json_str)
+        logger.info("Successfully parsed secret JSON")
+        return value
+    except orjson.JSONDecodeError:
+        # If not valid JSON, return the raw text
+        logger.info("Secret is not JSON, returning raw text")
+        return json_str
 
 class OnePasswordAuthedClient:
     """MCP client that connects to an Authed-protected 1Password service."""
@@ -41,9 +273,15 @@ class OnePasswordAuthedClient:
         """Initialize the client."""
         logger.info("Initializing OnePasswordAuthedClient")
         
+        self.config = config = load_config()
+        
         # Check required environment variables
-        required_vars = ["AUTHED_REGISTRY_URL", "AUTHED_AGENT_ID", "AUTHED_AGENT_SECRET"]
-        missing_vars = [var for var in required_vars if not os.getenv(var)]
+        required_vars = {
+            "AUTHED_REGISTRY_URL": config.registry_url,
+            "AUTHED_AGENT_ID": config.agent_id,
+            "AUTHED_AGENT_SECRET": config.agent_secret,
+        }
+        missing_vars = [var for var, value in required_vars.items() if not value]
         
         if missing_vars:
             error_msg = f"Missing required environment variables: {', '.join(missing_vars)}"
@@ -51,293 +289,426 @@ class OnePasswordAuthedClient:
             raise ValueError(error_msg)
         
         try:
-            # Initialize Authed SDK
-            logger.info("Initializing Authed SDK...")
-            self.authed = Authed.initialize(
-                registry_url=os.getenv("AUTHED_REGISTRY_URL", "https://api.getauthed.dev"),
-                agent_id=os.getenv("AUTHED_AGENT_ID"),
-                agent_secret=os.getenv("AUTHED_AGENT_SECRET"),
-                private_key=os.getenv("AUTHED_PRIVATE_KEY"),
-                public_key=os.getenv("AUTHED_PUBLIC_KEY")
+            self.authed = _get_authed(
+                config.registry_url,
+                config.agent_id,
+                config.agent_secret,
+                config.private_key,
+                config.public_key
             )
-            logger.info("Authed SDK initialized successfully")
         except Exception as e:
-            logger.error(f"Failed to initialize Authed SDK: {str(e)}")
+            logger.error("Failed to initialize Authed SDK: %s", e)
             raise
         
         # Server URL from environment variables
-        self.server_url = os.getenv("OP_SERVICE_URL", "http://localhost:8000/sse")
-        logger.info(f"Using service URL: {self.server_url}")
+        self.server_url = config.server_url
+        logger.info("Using service URL: %s", self.server_url)
         
         # Initialize session and context variables
         self.session = None
         self.exit_stack = AsyncExitStack()
-        self._streams_context = None
-        self._session_context = None
+        self._breaker = CircuitBreaker()
+        
+        # One owner task enters and exits the SSE and session contexts, since anyio
+        # requires both to happen in the same task; callers wait on _session_ready
+        # and ask the owner for a fresh session through _reconnect_requested
+        self._session_task: Optional[asyncio.Task] = None
+        self._session_ready: Optional[asyncio.Future] = None
+        self._reconnect_requested = asyncio.Event()
+        
+        # Bound the number of tool calls in flight on the shared session
+        self._call_semaphore = asyncio.Semaphore(config.max_concurrent_calls)
+        
+        # Vault and item listings rarely change, so reuse them for a while
+        self._list_cache = AsyncTTLCache(config.list_cache_ttl)
+        # Required arguments per tool, taken from the last tool listing
+        self._required_args: Optional[Dict[str, frozenset]] = None
+        
+        # Keep-alive pings are only sent once the session has been idle for a while
+        self._last_activity = 0.0
+        self._keepalive_delay = config.keepalive_interval
         
         # Get target agent ID - this should be the agent ID of the server we're connecting to
-        self.target_agent_id = os.getenv("TARGET_AGENT_ID")
+        self.target_agent_id = config.target_agent_id
         if not self.target_agent_id:
             logger.warning("TARGET_AGENT_ID not set - authentication may fail")
         
     async def connect(self):
         """Connect to the 1Password MCP service."""
-        try:
-            logger.info(f"Connecting to MCP server at {self.server_url}")
-            
-            # Get target agent ID - the ID of the server we're connecting to
-            target_agent_id = self.target_agent_id
-            self_agent_id = self.authed.agent_id
+        return await self._ensure_session()
+    
+    async def _auth_headers(self) -> Dict[str, str]:
+        """Build the authentication headers for a new SSE connection."""
+        # Get target agent ID - the ID of the server we're connecting to
+        target_agent_id = self.target_agent_id
+        self_agent_id = self.authed.agent_id
+        
+        # Check if target_agent_id is the same as self_agent_id (this won't work)
+        if target_agent_id and target_agent_id == self_agent_id:
+            logger.warning("Target agent ID (%s) is the same as this agent's ID - this will not work with Authed", target_agent_id)
+            target_agent_id = None
+        
+        # Create authentication headers
+        headers = {
+            'User-Agent': 'OnePasswordAuthedClient/1.0'
+        }
+        
+        if target_agent_id:
+            logger.info("Creating Authed authentication for target: %s", target_agent_id)
             
-            # Check if target_agent_id is the same as self_agent_id (this won't work)
-            if target_agent_id and target_agent_id == self_agent_id:
-                logger.warning(f"Target agent ID ({target_agent_id}) is the same as this agent's ID - this will not work with Authed")
+            try:
+                # Get auth handler from Authed SDK
+                auth_handler = self.authed.auth
+                
+                # Create authentication headers manually
+                # This is similar to what protect_request would do internally
+                auth_headers = await auth_handler.protect_request(
+                    method="GET",
+                    url=self.server_url,
+                    target_agent_id=target_agent_id
+                )
+                
+                # Add the auth headers to our headers dict
+                if auth_headers:
+                    headers.update(auth_headers)
+                    logger.info("Added Authed authentication headers: %s", list(auth_headers))
+                    logger.debug("Auth headers details: %s", auth_headers)
+                else:
+                    logger.warning("No authentication headers returned by Authed SDK")
+            except Exception as e:
+                logger.error("Error creating Authed authentication: %s", e)
+                logger.debug("Authentication error details", exc_info=True)
+                # Fall back to basic auth
                 target_agent_id = None
+        
+        # If still no target_agent_id or Authed auth failed, use basic auth
+        if not target_agent_id or 'authorization' not in headers:
+            logger.warning("Using fallback Basic authentication")
+            auth_credentials = f"{self.authed.agent_id}:{self.config.agent_secret or ''}"
+            encoded_credentials = base64.b64encode(auth_credentials.encode()).decode('utf-8')
+            headers['Authorization'] = f"Basic {encoded_credentials}"
+        
+        logger.info("Created authentication headers: %s", list(headers))
+        return headers
+    
+    async def _own_session(self):
+        """Hold the MCP session in this one task, reopening it whenever it breaks or a reconnect is requested."""
+        # The keep-alive lives exactly as long as its owner and only ever asks it to reconnect
+        keepalive = asyncio.create_task(self._keepalive_loop())
+        try:
+            while True:
+                await with_backoff(self._run_session, breaker=self._breaker)
+        except Exception as e:
+            self._fail_ready(e)
+        finally:
+            keepalive.cancel()
+            self.session = None
+            self._fail_ready(ValueError("MCP client closed"))
+    
+    async def _run_session(self):
+        """Open one session, publish it, and keep it open until it breaks or a reconnect is requested."""
+        connected = False
+        try:
+            logger.info("Connecting to MCP server at %s", self.server_url)
             
-            # Create authentication headers
-            headers = {
-                'User-Agent': 'OnePasswordAuthedClient/1.0'
-            }
+            # Create SSE client with the authentication headers
+            from mcp import ClientSession
+            from mcp.client.sse import sse_client
             
-            if target_agent_id:
-                logger.info(f"Creating Authed authentication for target: {target_agent_id}")
-                
-                try:
-                    # Get auth handler from Authed SDK
-                    auth_handler = self.authed.auth
+            try:
+                # The whole handshake shares one deadline, lifted once the session is up.
+                # A cancel scope rather than wait_for keeps the contexts in this task.
+                with anyio.CancelScope(deadline=anyio.current_time() + TIMEOUTS["connect"]) as connect_scope:
+                    headers = await self._auth_headers()
                     
-                    # Create authentication headers manually
-                    # This is similar to what protect_request would do internally
-                    auth_headers = await auth_handler.protect_request(
-                        method="GET",
+                    logger.debug("Entering streams context")
+                    async with sse_client(
                         url=self.server_url,
-                        target_agent_id=target_agent_id
-                    )
-                    
-                    # Add the auth headers to our headers dict
-                    if auth_headers:
-                        headers.update(auth_headers)
-                        logger.info(f"Added Authed authentication headers: {list(auth_headers.keys())}")
-                        logger.debug(f"Auth headers details: {auth_headers}")
-                    else:
-                        logger.warning("No authentication headers returned by Authed SDK")
-                except Exception as e:
-                    logger.error(f"Error creating Authed authentication: {str(e)}")
-                    logger.debug(f"Authentication error details: {traceback.format_exc()}")
-                    # Fall back to basic auth
-                    target_agent_id = None
-            
-            # If still no target_agent_id or Authed auth failed, use basic auth
-            if not target_agent_id or 'authorization' not in headers:
-                logger.warning("Using fallback Basic authentication")
-                auth_credentials = f"{self.authed.agent_id}:{os.getenv('AUTHED_AGENT_SECRET', '')}"
-                encoded_credentials = base64.b64encode(auth_credentials.encode()).decode('utf-8')
-                headers['Authorization'] = f"Basic {encoded_credentials}"
+                        headers=headers,
+                        timeout=TIMEOUTS["connect"],
+                        sse_read_timeout=TIMEOUTS["sse_read"]
+                    ) as streams:
+                        logger.debug("Entering session context")
+                        async with ClientSession(*streams) as session:
+                            logger.debug("Initializing session")
+                            await session.initialize()
+                            
+                            logger.debug("Listing tools to verify connection")
+                            # List available tools to verify connection
+                            response = await session.list_tools()
+                            tools = response.tools
+                            self._required_args = _required_arguments(tools)
+                            if logger.isEnabledFor(logging.INFO):
+                                logger.info("Connected to server with tools: %s", [tool.name for tool in tools])
+                            
+                            connect_scope.deadline = math.inf
+                            connected = True
+                            opened_at = time.monotonic()
+                            self._publish(session)
+                            await self._serve(session)
+                if connect_scope.cancelled_caught:
+                    raise TimeoutError(f"Handshake timed out after {TIMEOUTS['connect']:.0f}s")
+            except Exception as conn_error:
+                if not connected:
+                    await self._diagnose_connection(conn_error)
+                    raise
+                # The session was up; closing it is not a failed connection attempt
+                logger.warning("Error closing MCP session: %s", conn_error)
             
-            logger.info(f"Created authentication headers: {list(headers.keys())}")
+            self._reconnect_requested.clear()
+            if self.session is not None:
+                # The stream broke on its own rather than at a caller's request
+                logger.warning("MCP session closed, reconnecting")
+                self._retire_session()
             
-            # Create SSE client with the authentication headers
-            try:
-                logger.debug("Creating SSE client context")
-                self._streams_context = sse_client(
-                    url=self.server_url,
-                    headers=headers,
-                    timeout=30.0,   # Increase timeout for the connection
-                    sse_read_timeout=120.0  # Increase read timeout
-                )
-                
-                logger.debug("Entering streams context")
-                # Enter the streams context
-                streams = await self._streams_context.__aenter__()
-                
-                logger.debug("Creating session context")
-                # Create session context
-                self._session_context = ClientSession(*streams)
-                
-                logger.debug("Entering session context")
-                # Enter the session context
-                self.session = await self._session_context.__aenter__()
-                
-                logger.debug("Initializing session")
-                # Initialize the session
-                await self.session.initialize()
-                
-                logger.debug("Listing tools to verify connection")
-                # List available tools to verify connection
-                response = await self.session.list_tools()
-                tools = response.tools
-                logger.info(f"Connected to server with tools: {[tool.name for tool in tools]}")
-                
-                return self.session
-            except Exception as conn_error:
-                detailed_error = str(conn_error)
-                if not detailed_error:
-                    detailed_error = f"Empty error ({type(conn_error).__name__}). Check server logs."
-                
-                logger.error(f"Connection error: {detailed_error}")
-                logger.debug(f"Connection error details: {traceback.format_exc()}")
-                
-                # Try to diagnose the issue
-                logger.info("Attempting to diagnose connection issue...")
-                try:
-                    # Make a simple request to check basic connectivity
-                    async with httpx.AsyncClient() as client:
-                        health_url = self.server_url.replace("/sse", "/health")
-                        logger.info(f"Checking health endpoint: {health_url}")
-                        response = await client.get(health_url, timeout=5.0)
-                        logger.info(f"Health check response: {response.status_code}")
-                        if response.status_code == 200:
-                            logger.info(f"Health check successful: {response.text}")
-                        else:
-                            logger.warning(f"Health check failed: {response.text}")
-                except Exception as health_e:
-                    logger.warning(f"Health check failed: {str(health_e)}")
-                
-                raise
+            # A server that accepts connections and drops them straight away is failing,
+            # so reopening goes through the back-off and the circuit breaker
+            lifetime = time.monotonic() - opened_at
+            if lifetime < SESSION_MIN_LIFETIME:
+                raise ConnectionError(f"Session closed {lifetime:.1f}s after opening")
                 
         except Exception as e:
             error_msg = str(e)
             if not error_msg:
                 error_msg = f"Empty error ({type(e).__name__}). Check server logs."
-            logger.error(f"Failed to connect to MCP server: {error_msg}")
-            logger.debug(f"Connection failure details: {traceback.format_exc()}")
-            await self.cleanup()
+            logger.error("Failed to connect to MCP server: %s", error_msg)
+            logger.debug("Connection failure details", exc_info=True)
             raise ValueError(f"Connection failed: {error_msg}")
     
+    async def _diagnose_connection(self, conn_error: Exception):
+        """Log a failed connection attempt and whether the server's health endpoint answers."""
+        detailed_error = str(conn_error)
+        if not detailed_error:
+            detailed_error = f"Empty error ({type(conn_error).__name__}). Check server logs."
+        
+        logger.error("Connection error: %s", detailed_error)
+        logger.debug("Connection error details", exc_info=True)
+        
+        # Try to diagnose the issue
+        logger.info("Attempting to diagnose connection issue...")
+        try:
+            import httpx
+            
+            # Make a simple request to check basic connectivity
+            async with httpx.AsyncClient() as client:
+                health_url = self.server_url.replace("/sse", "/health")
+                logger.info("Checking health endpoint: %s", health_url)
+                response = await client.get(health_url, timeout=5.0)
+                logger.info("Health check response: %s", response.status_code)
+                if response.status_code == 200:
+                    logger.info("Health check successful: %s", response.text)
+                else:
+                    logger.warning("Health check failed: %s", response.text)
+        except Exception as health_e:
+            logger.warning("Health check failed: %s", health_e)
+    
+    async def _serve(self, session):
+        """Wait until the session's stream fails or a reconnect is requested."""
+        async with anyio.create_task_group() as tg:
+            async def wait_for_reconnect():
+                await self._reconnect_requested.wait()
+                tg.cancel_scope.cancel()
+            
+            tg.start_soon(wait_for_reconnect)
+            # The session reports a broken stream only here, and stalls until it is read
+            async for message in session.incoming_messages:
+                if isinstance(message, Exception):
+                    logger.warning("MCP stream failed: %s", message)
+                    break
+            tg.cancel_scope.cancel()
+    
+    def _publish(self, session):
+        """Make a freshly opened session available to callers."""
+        self.session = session
+        self._touch()
+        if not self._session_ready.done():
+            self._session_ready.set_result(session)
+    
+    def _fail_ready(self, error: Exception):
+        """Fail the callers waiting for a session."""
+        if not self._session_ready.done():
+            self._session_ready.set_exception(error)
+            # Nobody may be waiting; don't let asyncio report the error as unretrieved
+            self._session_ready.exception()
+    
+    def _retire_session(self):
+        """Forget the current session, so callers wait for the owner task's next one."""
+        self.session = None
+        self._session_ready = asyncio.get_running_loop().create_future()
+    
+    async def _ensure_session(self):
+        """Connect on first use, sharing one connection between concurrent callers."""
+        if self.session:
+            return self.session
+        
+        if self._session_task is None or self._session_task.done():
+            logger.info("Session not connected, connecting now")
+            self._session_ready = asyncio.get_running_loop().create_future()
+            self._reconnect_requested.clear()
+            self._session_task = asyncio.create_task(self._own_session())
+        # Callers giving up must not cancel the connection others are waiting on,
+        # and none waits longer than one handshake while the owner keeps retrying
+        try:
+            return await asyncio.wait_for(asyncio.shield(self._session_ready), TIMEOUTS["connect"])
+        except asyncio.TimeoutError:
+            raise ValueError(f"No MCP session after {TIMEOUTS['connect']:.0f}s")
+    
+    async def _call_tool(self, name: str, arguments: Dict[str, Any]) -> Any:
+        """Call a tool on the shared session, letting independent calls overlap up to a limit."""
+        async with self._call_semaphore:
+            session = await self._ensure_session()
+            self._check_arguments(name, arguments)
+            self._touch()
+            timeout = _tool_timeout(name)
+            try:
+                try:
+                    return await asyncio.wait_for(session.call_tool(name, arguments), timeout)
+                except (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream):
+                    # The SSE stream died under us; reconnect once and retry on a fresh session
+                    logger.warning("MCP session closed during %s, reconnecting", name)
+                    session = await self._reconnect(session)
+                    return await asyncio.wait_for(session.call_tool(name, arguments), timeout)
+            except asyncio.TimeoutError:
+                raise ValueError(f"{name} timed out after {timeout:.0f}s")
+    
+    def _check_arguments(self, name: str, arguments: Dict[str, Any]):
+        """Reject calls the server would refuse anyway, without a round-trip."""
+        if self._required_args is None:
+            return
+        
+        required = self._required_args.get(name)
+        if required is None:
+            raise ValueError(f"Unknown tool: {name}")
+        missing = required.difference(arguments)
+        if missing:
+            raise ValueError(f"Missing required arguments for {name}: {', '.join(sorted(missing))}")
+    
+    async def _reconnect(self, dead_session):
+        """Ask the owner task to replace a dead session, letting only the first of several failed callers do so."""
+        if dead_session is not None and self.session is dead_session:
+            self._retire_session()
+            self._reconnect_requested.set()
+        return await self._ensure_session()
+    
+    def _touch(self):
+        """Record traffic on the session, pushing the next keep-alive back."""
+        self._last_activity = asyncio.get_running_loop().time()
+    
+    async def _keepalive_loop(self):
+        """Ping the server whenever the session has been idle long enough, independently of tool calls."""
+        loop = asyncio.get_running_loop()
+        while True:
+            if self.session is None:
+                # Nothing to keep alive while the owner task is still connecting
+                try:
+                    await asyncio.shield(self._session_ready)
+                except Exception:
+                    pass
+                continue
+            
+            # Real traffic pushes the deadline back, so sleep until it instead of ticking
+            deadline = self._last_activity + self._keepalive_delay
+            now = loop.time()
+            if now < deadline:
+                await asyncio.sleep(deadline - now)
+                continue
+            
+            await self._send_keepalive()
+    
+    async def _send_keepalive(self):
+        """Ping the server, reconnecting with a geometric back-off when the ping goes unanswered."""
+        session = self.session
+        try:
+            await self.ping()
+            self._keepalive_delay = self.config.keepalive_interval
+        except Exception as e:
+            self._keepalive_delay = min(self._keepalive_delay * 2, KEEPALIVE_MAX_BACKOFF)
+            logger.warning("Keep-alive ping failed (%s), reconnecting; next attempt in %.0fs", e, self._keepalive_delay)
+            try:
+                await self._reconnect(session)
+            except Exception as reconnect_error:
+                logger.warning("Reconnect after missed keep-alive failed: %s", reconnect_error)
+                self._touch()
+    
     async def cleanup(self):
         """Properly clean up the session and streams."""
         logger.info("Cleaning up MCP client resources")
+        # Cancelling the owner task makes it exit the session contexts itself
+        task, self._session_task = self._session_task, None
+        if task and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        self.session = None
+        logger.info("Cleanup completed successfully")
+    
+    async def warm_up(self) -> None:
+        """Open the session and prefetch the tool and vault listings before the first real call."""
+        await self._ensure_session()
+        await self.list_vaults()
+    
+    async def ping(self) -> None:
+        """Check that the service is reachable without calling any tools."""
+        session = await self._ensure_session()
+        self._touch()
         try:
-            if self._session_context:
-                await self._session_context.__aexit__(None, None, None)
-                self._session_context = None
-                
-            if self._streams_context:
-                await self._streams_context.__aexit__(None, None, None)
-                self._streams_context = None
-                
-            self.session = None
-            logger.info("Cleanup completed successfully")
-        except Exception as e:
-            logger.error(f"Error during cleanup: {str(e)}")
+            await asyncio.wait_for(session.send_ping(), TIMEOUTS["read"])
+        except asyncio.TimeoutError:
+            raise ValueError(f"Ping timed out after {TIMEOUTS['read']:.0f}s")
+    
+    async def forward_tool(self, name: str, arguments: Dict[str, Any], cached: bool = False) -> List[Any]:
+        """
+        Call a tool and return its content blocks unparsed, for relaying to another MCP client.
+        
+        Args:
+            name: The tool to call on the 1Password service
+            arguments: The tool arguments
+            cached: Reuse the result for OP_LIST_CACHE_TTL seconds, for listings
+            
+        Returns:
+            The content blocks of the tool result
+        """
+        if not cached:
+            return await self._fetch_content(name, arguments)
+        key = (name, *sorted(arguments.items()))
+        return await self._list_cache.get(key, lambda: self._fetch_content(name, arguments))
+    
+    async def _fetch_content(self, name: str, arguments: Dict[str, Any]) -> List[Any]:
+        """Call a tool and return its content blocks, raising if the tool reported an error."""
+        result = await self._call_tool(name, arguments)
+        if result.isError:
+            texts = _content_texts(result.content) or []
+            raise ValueError(f"{name} failed: {' '.join(texts)}")
+        return result.content
     
     async def list_vaults(self) -> List[Dict[str, str]]:
-        """List all available 1Password vaults."""
+        """List all available 1Password vaults, reusing listings for OP_LIST_CACHE_TTL seconds."""
         logger.info("Listing 1Password vaults")
-        if not self.session:
-            logger.info("Session not connected, connecting now")
-            await self.connect()
-            
         try:
-            result = await self.session.call_tool("onepassword_list_vaults", {})
-            logger.info(f"Successfully retrieved vaults response")
-            
-            # Parse the content from the response
-            # The content may be a list of TextContent objects with JSON strings
-            content = result.content
-            
-            # If content is a list with a single TextContent item
-            if isinstance(content, list) and len(content) == 1 and hasattr(content[0], 'text'):
-                # Extract the text which should be a JSON string
-                json_str = content[0].text
-                logger.debug(f"Parsing JSON from TextContent: {json_str}")
-                
-                # Parse the JSON string into a Python object
-                import json
-                vaults = json.loads(json_str)
-                
-                # Make sure we got a list (if it's a single item, wrap it)
-                if not isinstance(vaults, list):
-                    vaults = [vaults]
-                    
-                logger.info(f"Successfully parsed {len(vaults)} vaults")
-                return vaults
-            elif hasattr(content, 'text'):  # If content is a single TextContent
-                json_str = content.text
-                logger.debug(f"Parsing JSON from TextContent: {json_str}")
-                
-                # Parse the JSON string
-                import json
-                vaults = json.loads(json_str)
-                
-                # Make sure we got a list
-                if not isinstance(vaults, list):
-                    vaults = [vaults]
-                    
-                logger.info(f"Successfully parsed {len(vaults)} vaults")
-                return vaults
-            else:
-                # Just return the content as-is if it's already a list
-                logger.info(f"Content is already parsed: {type(content)}")
-                return content
+            # Shares its cache entry with the relayed listing, and is parsed on each call
+            content = await self.forward_tool("onepassword_list_vaults", {}, cached=True)
+            return _parse_list_content(content, "vaults")
                 
         except Exception as e:
-            logger.error(f"Error listing vaults: {str(e)}")
-            logger.debug(f"Error details: {traceback.format_exc()}")
+            logger.error("Error listing vaults: %s", e)
+            logger.debug("Error details", exc_info=True)
             raise
-            
+    
     async def list_items(self, vault_id: str) -> List[Dict[str, str]]:
-        """List all items in a vault."""
-        logger.info(f"Listing items in vault {vault_id}")
-        if not self.session:
-            logger.info("Session not connected, connecting now")
-            await self.connect()
-            
+        """List all items in a vault, reusing listings for OP_LIST_CACHE_TTL seconds."""
+        logger.info("Listing items in vault %s", vault_id)
         try:
-            result = await self.session.call_tool("onepassword_list_items", {
-                "vault_id": vault_id
-            })
-            logger.info(f"Successfully retrieved items response")
-            
-            # Parse the content from the response
-            content = result.content
-            
-            # If content is a list with a single TextContent item
-            if isinstance(content, list) and len(content) == 1 and hasattr(content[0], 'text'):
-                # Extract the text which should be a JSON string
-                json_str = content[0].text
-                logger.debug(f"Parsing JSON from TextContent: {json_str}")
-                
-                # Parse the JSON string into a Python object
-                import json
-                items = json.loads(json_str)
-                
-                # Make sure we got a list
-                if not isinstance(items, list):
-                    items = [items]
-                    
-                logger.info(f"Successfully parsed {len(items)} items")
-                return items
-            elif hasattr(content, 'text'):  # If content is a single TextContent
-                json_str = content.text
-                logger.debug(f"Parsing JSON from TextContent: {json_str}")
-                
-                # Parse the JSON string
-                import json
-                items = json.loads(json_str)
-                
-                # Make sure we got a list
-                if not isinstance(items, list):
-                    items = [items]
-                    
-                logger.info(f"Successfully parsed {len(items)} items")
-                return items
-            else:
-                # Just return the content as-is if it's already a list
-                logger.info(f"Content is already parsed: {type(content)}")
-                return content
+            content = await self.forward_tool("onepassword_list_items", {"vault_id": vault_id}, cached=True)
+            return _parse_list_content(content, "items")
                 
         except Exception as e:
-            logger.error(f"Error listing items in vault {vault_id}: {str(e)}")
-            logger.debug(f"Error details: {traceback.format_exc()}")
+            logger.error("Error listing items in vault %s: %s", vault_id, e)
+            logger.debug("Error details", exc_info=True)
             raise
             
     async def get_secret(self, vault_id: str, item_id: str, field_name: Optional[str] = None) -> Any:
         """Get a secret from 1Password."""
-        logger.info(f"Getting secret from vault={vault_id}, item={item_id}, field={field_name}")
-        if not self.session:
-            logger.info("Session not connected, connecting now")
-            await self.connect()
+        logger.info("Getting secret from vault=%s, item=%s, field=%s", vault_id, item_id, field_name)
+        await self._ensure_session()
             
         try:
             # Prepare arguments
@@ -351,55 +722,22 @@ class OnePasswordAuthedClient:
                 args["field_name"] = field_name
                 
             # Call the tool
-            result = await self.session.call_tool("onepassword_get_secret", args)
-            logger.info(f"Successfully retrieved secret response")
+            result = await self._call_tool("onepassword_get_secret", args)
+            logger.info("Successfully retrieved secret response")
             
             # Parse the content from the response
-            content = result.content
-            
-            # If content is a list with a single TextContent item
-            if isinstance(content, list) and len(content) == 1 and hasattr(content[0], 'text'):
-                # Extract the text which should be a JSON string
-                json_str = content[0].text
-                logger.debug(f"Parsing JSON from TextContent: {json_str}")
-                
-                # Parse the JSON string into a Python object
-                import json
-                try:
-                    secret = json.loads(json_str)
-                    logger.info("Successfully parsed secret JSON")
-                    return secret
-                except json.JSONDecodeError:
-                    # If not valid JSON, return the raw text
-                    logger.info("Secret is not JSON, returning raw text")
-                    return json_str
-            elif hasattr(content, 'text'):  # If content is a single TextContent
-                json_str = content.text
-                logger.debug(f"Parsing JSON from TextContent: {json_str}")
-                
-                # Try to parse as JSON
-                import json
-                try:
-                    secret = json.loads(json_str)
-                    logger.info("Successfully parsed secret JSON")
-                    return secret
-                except json.JSONDecodeError:
-                    # If not valid JSON, return the raw text
-                    logger.info("Secret is not JSON, returning raw text")
-                    return json_str
-            else:
-                # Just return the content as-is
-                logger.info(f"Content is already parsed: {type(content)}")
-                return content
+            return _parse_value_content(result.content)
                 
         except Exception as e:
-            logger.error(f"Error getting secret from vault={vault_id}, item={item_id}: {str(e)}")
-            logger.debug(f"Error details: {traceback.format_exc()}")
+            logger.error("Error getting secret from vault=%s, item=%s: %s", vault_id, item_id, e)
+            logger.debug("Error details", exc_info=True)
             raise
 
 async def main():
     """Simple test function."""
     client = None
+    items_tasks = []
+    secret_task = None
     try:
         logger.info("Starting 1Password Authed client demo")
         
@@ -410,44 +748,56 @@ async def main():
         print("\n=== Listing Vaults ===")
         vaults = await client.list_vaults()
         print(f"Found {len(vaults)} vaults:")
+        # Start listing each vault's items as soon as it is seen, so the requests
+        # run while the rest of the output is printed
         for vault in vaults:
+            items_tasks.append(asyncio.create_task(client.list_items(vault.get('id'))))
             print(f"  - ID: {vault.get('id', 'unknown')}, Name: {vault.get('name', 'unnamed')}")
         
-        # If we have vaults, list items in the first one
+        # Likewise fetch the first item's secret while the other vaults are printed
+        first_item = None
         if vaults:
-            first_vault = vaults[0]
-            vault_id = first_vault.get('id')
-            vault_name = first_vault.get('name', 'unnamed')
-            
-            print(f"\n=== Listing Items in '{vault_name}' Vault ===")
-            items = await client.list_items(vault_id)
+            first_items = await items_tasks[0]
+            if first_items:
+                first_item = first_items[0]
+                secret_task = asyncio.create_task(
+                    client.get_secret(vaults[0].get('id'), first_item.get('id'), "credential")
+                )
+        
+        for vault, items_task in zip(vaults, items_tasks):
+            items = await items_task
+            print(f"\n=== Listing Items in '{vault.get('name', 'unnamed')}' Vault ===")
             print(f"Found {len(items)} items:")
             for item in items:
                 print(f"  - ID: {item.get('id', 'unknown')}, Title: {item.get('title', 'unnamed')}")
+        
+        # If we have items in the first vault, report the secret from the first one
+        if secret_task:
+            item_title = first_item.get('title', 'unnamed')
             
-            # If we have items, get a secret from the first one
-            if items:
-                first_item = items[0]
-                item_id = first_item.get('id')
-                item_title = first_item.get('title', 'unnamed')
-                
-                print(f"\n=== Getting Secret from '{item_title}' ===")
-                secret = await client.get_secret(vault_id, item_id, "credential")
-                
-                # Just print success, don't display the actual secret
-                print(f"Successfully retrieved secret from '{item_title}'")
-                print(f"Secret type: {type(secret)}")
+            print(f"\n=== Getting Secret from '{item_title}' ===")
+            secret = await secret_task
+            
+            # Just print success, don't display the actual secret
+            print(f"Successfully retrieved secret from '{item_title}'")
+            print(f"Secret type: {type(secret)}")
                 
         print("\n=== Demo Completed Successfully ===")
             
     except Exception as e:
         print(f"\nERROR: {str(e)}")
-        logger.error(f"Demo failed: {str(e)}")
-        logger.debug(f"Error details: {traceback.format_exc()}")
+        logger.error("Demo failed: %s", e)
+        logger.debug("Error details", exc_info=True)
         sys.exit(1)
     finally:
+        # Don't leave requests running against a client that is being closed
+        tasks = [t for t in items_tasks + [secret_task] if t]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        
         # Make sure to clean up
-        if client and client.session:
+        if client:
             await client.cleanup()
 
 if __name__ == "__main__":
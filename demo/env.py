@@ -0,0 +1,24 @@
+import os
+import functools
+from typing import Optional, Mapping
+from dotenv import load_dotenv
+
+@functools.lru_cache(maxsize=None)
+def load_env(dotenv_path: Optional[str] = None) -> Mapping[str, str]:
+    """
+    Load environment variables from a .env file, parsing each file only once per process.
+    
+    Args:
+        dotenv_path (str, optional): The .env file to load, searched for from this directory if omitted
+        
+    Returns:
+        The process environment
+    """
+    if dotenv_path is None:
+        load_dotenv()
+    elif os.path.exists(dotenv_path):
+        load_dotenv(dotenv_path)
+        print(f"Loaded environment variables from {dotenv_path}")
+    else:
+        print(f"Warning: .env file not found at {dotenv_path}")
+    return os.environ
@@ -0,0 +1,38 @@
+import queue
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional, Union
+
+def setup_logging(level: Union[int, str] = logging.INFO, format: Optional[str] = None) -> None:
+    """
+    Configure root logging to write through a queue, so the event loop never blocks on log I/O.
+    
+    Like logging.basicConfig, this does nothing if the root logger already has handlers.
+    
+    Args:
+        level: The root log level
+        format (str, optional): The record format, defaults to logging's basic format
+    """
+    root = logging.getLogger()
+    if root.handlers:
+        return
+    
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(format or logging.BASIC_FORMAT))
+    
+    # Records are queued by the logging call and written out by the listener's thread
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, handler)
+    queue_handler = QueueHandler(log_queue)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    listener.start()
+    
+    def stop_listener() -> None:
+        # Records logged after this point, during shutdown, go straight to the stream
+        root.removeHandler(queue_handler)
+        root.addHandler(handler)
+        listener.stop()
+    
+    atexit.register(stop_listener)
@@ -1,27 +1,88 @@
 import os
-from onepassword.client import Client
-from typing import Dict, List, Optional, Any
+import time
+import functools
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Authenticated 1Password SDK clients, shared by every OnePasswordClient
+# so they all reuse one underlying HTTP session per service account token
+_authenticated_clients: Dict[str, Any] = {}
+_auth_lock = asyncio.Lock()
+
+# Lookup tables by exact ID, exact title and lowercased title, in match priority order
+_Index = Tuple[Dict[str, Dict[str, str]], Dict[str, Dict[str, str]], Dict[str, Dict[str, str]]]
+
+def _build_index(entries: List[Dict[str, str]], title_key: str) -> _Index:
+    """Index vaults or items for constant-time lookup by ID or title."""
+    by_id: Dict[str, Dict[str, str]] = {}
+    by_title: Dict[str, Dict[str, str]] = {}
+    by_folded_title: Dict[str, Dict[str, str]] = {}
+    for entry in entries:
+        # Keep the first match for each key, as a linear scan would
+        by_id.setdefault(entry["id"], entry)
+        by_title.setdefault(entry[title_key], entry)
+        by_folded_title.setdefault(entry[title_key].lower(), entry)
+    return by_id, by_title, by_folded_title
+
+@functools.lru_cache(maxsize=1024)
+def _build_ref(vault: str, item: str, field: Optional[str]) -> str:
+    """Build an op://<vault>/<item>[/<field>] secret reference, reusing the string for repeat lookups."""
+    return f"op://{vault}/{item}" + (f"/{field}" if field else "")
+
+def _lookup(index: _Index, id_or_name: str) -> Optional[Dict[str, str]]:
+    """Find an entry by exact ID, then exact title, then case-insensitive title."""
+    by_id, by_title, by_folded_title = index
+    return by_id.get(id_or_name) or by_title.get(id_or_name) or by_folded_title.get(id_or_name.lower())
 
 class OnePasswordClient:
     """Wrapper around 1Password SDK to retrieve secrets."""
     
     def __init__(self):
         """Initialize the 1Password client using environment variables."""
-        # These should be set in .env or provided securely
+        # These should be set in .env or provided securely; op_server loads
+        # its .env before any client is created
         self.op_token = os.getenv("OP_SERVICE_ACCOUNT_TOKEN")
         self.client = None
+        # The SDK's bulk resolver, if this version has one, looked up once on connect
+        self._resolve_all = None
+        
+        # In-memory TTL cache of resolved secrets, keyed on (vault, item, field)
+        self._cache: "OrderedDict[Tuple[str, str, str], Tuple[float, Any]]" = OrderedDict()
+        self._cache_ttl = int(os.getenv("OP_CACHE_TTL", "300"))
+        self._cache_max_size = int(os.getenv("OP_CACHE_MAX_SIZE", "256"))
+        
+        # Lookup indexes for vault and item names, refreshed with the same TTL
+        self._vault_index: Optional[Tuple[float, _Index]] = None
+        self._item_indexes: Dict[str, Tuple[float, _Index]] = {}
+        
+        # Upper bound on concurrent 1Password requests when fanning out
+        self._max_concurrency = int(os.getenv("OP_MAX_CONCURRENCY", "10"))
         
     async def connect(self):
         """Create connection to 1Password."""
         if not self.op_token:
             raise ValueError("OP_SERVICE_ACCOUNT_TOKEN environment variable is not set")
         
-        # Initialize the 1Password client
-        self.client = await Client.authenticate(
-            auth=self.op_token, 
-            integration_name="Authed MCP 1Password Integration", 
-            integration_version="v1.0.0"
-        )
+        async with _auth_lock:
+            client = _authenticated_clients.get(self.op_token)
+            if client is None:
+                # Import the SDK lazily so loading this module stays cheap
+                from onepassword.client import Client
+                
+                logger.debug("Authenticating with 1Password")
+                client = await Client.authenticate(
+                    auth=self.op_token, 
+                    integration_name="Authed MCP 1Password Integration", 
+                    integration_version="v1.0.0"
+                )
+                _authenticated_clients[self.op_token] = client
+        
+        self.client = client
+        self._resolve_all = getattr(client.secrets, "resolve_all", None)
         return self.client
     
     async def get_secret(self, vault_id_or_name: str, item_id_or_name: str, field_name: str = "credential") -> Any:
@@ -36,9 +97,82 @@ class OnePasswordClient:
         Returns:
             The secret value if field_name is specified, otherwise information about the item
         """
+        key = (vault_id_or_name, item_id_or_name, field_name)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        
+        if not self.client:
+            await self.connect()
+        
+        secret_ref = await self._secret_ref(vault_id_or_name, item_id_or_name, field_name)
+        
+        # Use the secret reference directly
+        try:
+            value = await self.client.secrets.resolve(secret_ref)
+        except Exception as e:
+            raise ValueError(f"Error retrieving secret: {e}")
+        
+        self._cache_put(key, value)
+        return value
+    
+    async def get_secrets(self, refs: List[Tuple[str, str, str]]) -> List[Any]:
+        """
+        Retrieve several secrets from 1Password in a single request.
+        
+        Args:
+            refs (list): (vault_id_or_name, item_id_or_name, field_name) tuples
+            
+        Returns:
+            The secret values, in the same order as refs
+        """
+        results: List[Any] = [None] * len(refs)
+        pending: Dict[Tuple[str, str, str], List[int]] = {}
+        
+        # Serve what we can from the cache and only fetch the rest
+        for index, ref in enumerate(refs):
+            key = tuple(ref)
+            cached = self._cache_get(key)
+            if cached is not None:
+                results[index] = cached
+            else:
+                pending.setdefault(key, []).append(index)
+        
+        if not pending:
+            return results
+        
         if not self.client:
             await self.connect()
         
+        if self._resolve_all is None:
+            # Older SDKs have no bulk endpoint, so fall back to concurrent single lookups
+            keys = list(pending)
+            values = await asyncio.gather(*(self.get_secret(*key) for key in keys))
+            for key, value in zip(keys, values):
+                for index in pending[key]:
+                    results[index] = value
+            return results
+        
+        secret_refs = {key: await self._secret_ref(*key) for key in pending}
+        try:
+            response = await self._resolve_all(list(secret_refs.values()))
+        except Exception as e:
+            raise ValueError(f"Error retrieving secrets: {e}")
+        
+        for key, secret_ref in secret_refs.items():
+            resolved = response.individual_responses[secret_ref]
+            if resolved.error is not None:
+                raise ValueError(f"Error retrieving secret '{secret_ref}': {resolved.error}")
+            
+            value = resolved.content.secret
+            self._cache_put(key, value)
+            for index in pending[key]:
+                results[index] = value
+        
+        return results
+    
+    async def _secret_ref(self, vault_id_or_name: str, item_id_or_name: str, field_name: str) -> str:
+        """Build the op:// secret reference for a vault, item and field."""
         # First, find the vault
         vault_info = await self._find_vault(vault_id_or_name)
         if not vault_info:
@@ -52,73 +186,98 @@ class OnePasswordClient:
         if not item_info:
             raise ValueError(f"Item '{item_id_or_name}' not found in vault '{vault_title}'")
         
-        item_id = item_info["id"]
         item_title = item_info["title"]
         
-        # Use the secret reference directly
-        try:
-            # Format: op://<vault>/<item>/<field>
-            # Use vault title and item title in the reference
-            secret_ref = f"op://{vault_title}/{item_title}/{field_name}"
-            return await self.client.secrets.resolve(secret_ref)
-        except Exception as e:
-            raise ValueError(f"Error retrieving secret: {e}")
+        # Use vault title and item title in the reference
+        return _build_ref(vault_title, item_title, field_name)
+    
+    def invalidate(self, key: Optional[Tuple[str, str, str]] = None) -> None:
+        """
+        Evict cached secrets.
+        
+        Args:
+            key (tuple, optional): The (vault, item, field) entry to evict; clears the whole cache if omitted
+        """
+        if key is None:
+            self._cache.clear()
+            self._vault_index = None
+            self._item_indexes.clear()
+        else:
+            self._cache.pop(key, None)
+    
+    def _cache_get(self, key: Tuple[str, str, str]) -> Optional[Any]:
+        """Return a cached secret if present and not expired."""
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        
+        ts, value = entry
+        if time.monotonic() - ts >= self._cache_ttl:
+            del self._cache[key]
+            return None
+        
+        self._cache.move_to_end(key)
+        return value
+    
+    def _cache_put(self, key: Tuple[str, str, str], value: Any) -> None:
+        """Store a secret in the cache, evicting the least recently used entry when full."""
+        if self._cache_ttl <= 0:
+            return
+        
+        self._cache[key] = (time.monotonic(), value)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._cache_max_size:
+            self._cache.popitem(last=False)
     
     async def _find_vault(self, vault_id_or_name: str) -> Optional[Dict[str, str]]:
         """Find a vault by ID or name."""
-        vaults = await self.list_vaults()
-        
-        # First try exact ID match
-        for vault in vaults:
-            if vault["id"] == vault_id_or_name:
+        cached = self._vault_index
+        if cached is not None and time.monotonic() - cached[0] < self._cache_ttl:
+            vault = _lookup(cached[1], vault_id_or_name)
+            if vault:
                 return vault
         
-        # Then try exact name match
-        for vault in vaults:
-            if vault["name"] == vault_id_or_name:
-                return vault
-                
-        # Finally try case-insensitive name match
-        for vault in vaults:
-            if vault["name"].lower() == vault_id_or_name.lower():
-                return vault
-                
-        return None
+        # Missing or stale index, or an unknown name that may be a new vault
+        await self._refresh_vault_index()
+        return _lookup(self._vault_index[1], vault_id_or_name)
+    
+    async def _refresh_vault_index(self) -> None:
+        """Rebuild the vault lookup index from a fresh listing."""
+        self._vault_index = (time.monotonic(), _build_index(await self.list_vaults(), "name"))
+    
+    async def warm_up(self) -> None:
+        """Connect and load the vault index so the first secret lookup skips the vault listing."""
+        await self.connect()
+        await self._refresh_vault_index()
     
     async def _find_item(self, vault_id: str, item_id_or_name: str) -> Optional[Dict[str, str]]:
         """Find an item by ID or name in a specific vault."""
-        items = await self.list_items(vault_id)
-        
-        # First try exact ID match
-        for item in items:
-            if item["id"] == item_id_or_name:
+        cached = self._item_indexes.get(vault_id)
+        if cached is not None and time.monotonic() - cached[0] < self._cache_ttl:
+            item = _lookup(cached[1], item_id_or_name)
+            if item:
                 return item
         
-        # Then try exact title match
-        for item in items:
-            if item["title"] == item_id_or_name:
-                return item
-                
-        # Finally try case-insensitive title match
-        for item in items:
-            if item["title"].lower() == item_id_or_name.lower():
-                return item
-                
-        return None
+        # Missing or stale index, or an unknown title that may be a new item
+        index = _build_index(await self.list_items(vault_id), "title")
+        self._item_indexes[vault_id] = (time.monotonic(), index)
+        return _lookup(index, item_id_or_name)
     
-    async def list_vaults(self) -> List[Dict[str, str]]:
-        """List all available vaults."""
+    async def iter_vaults(self) -> AsyncIterator[Dict[str, str]]:
+        """Yield available vaults as the SDK streams them in."""
         if not self.client:
             await self.connect()
         
-        result = []
         vaults = await self.client.vaults.list_all()
         async for vault in vaults:
-            result.append({"id": vault.id, "name": vault.title})
-        return result
+            yield {"id": vault.id, "name": vault.title}
     
-    async def list_items(self, vault_id_or_name: str) -> List[Dict[str, str]]:
-        """List all items in a vault."""
+    async def list_vaults(self) -> List[Dict[str, str]]:
+        """List all available vaults."""
+        return [vault async for vault in self.iter_vaults()]
+    
+    async def iter_items(self, vault_id_or_name: str) -> AsyncIterator[Dict[str, str]]:
+        """Yield the items in a vault as the SDK streams them in."""
         if not self.client:
             await self.connect()
         
@@ -131,8 +290,23 @@ class OnePasswordClient:
         else:
             vault_id = vault_id_or_name
         
-        result = []
         items = await self.client.items.list_all(vault_id)
         async for item in items:
-            result.append({"id": item.id, "title": item.title})
-        return result
+            yield {"id": item.id, "title": item.title}
+    
+    async def list_items(self, vault_id_or_name: str) -> List[Dict[str, str]]:
+        """List all items in a vault."""
+        return [item async for item in self.iter_items(vault_id_or_name)]
+    
+    async def list_all_items(self) -> List[Dict[str, Any]]:
+        """List every vault together with its items."""
+        vaults = await self.list_vaults()
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+        
+        async def list_vault_items(vault: Dict[str, str]) -> List[Dict[str, str]]:
+            async with semaphore:
+                return await self.list_items(vault["id"])
+        
+        # Fetch the items of all vaults concurrently rather than one vault at a time
+        items = await asyncio.gather(*(list_vault_items(vault) for vault in vaults))
+        return [{**vault, "items": vault_items} for vault, vault_items in zip(vaults, items)]
\ No newline at end of file
@@ -1,33 +1,42 @@
 import os
+import re
+import sys
+import time
+import base64
 import asyncio
+import json
 import logging
-from typing import List, Dict, Any, Optional, Callable
+from typing import List, Dict, Any, Optional, Callable, Tuple
 from mcp.server.fastmcp import FastMCP
+from mcp.types import TextContent
 from authed.sdk import Authed
 from fastapi import FastAPI
 from authed.sdk.decorators.incoming.fastapi import verify_fastapi
+# The env and logging helpers are shared with the client, in the demo directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from op_client import OnePasswordClient
-from dotenv import load_dotenv
+from env import load_env
+from logging_setup import setup_logging
 from starlette.applications import Starlette
 from mcp.server.sse import SseServerTransport
 from starlette.requests import Request as StarletteRequest
-from starlette.responses import Response as StarletteResponse
+from starlette.responses import HTMLResponse, Response as StarletteResponse
 from starlette.routing import Mount, Route
 from starlette.middleware import Middleware
 from starlette.middleware.base import BaseHTTPMiddleware
-import uvicorn
-import json
+from starlette.datastructures import URL, Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+try:
+    # Optional, and only faster: the stdlib json module is used without it
+    import orjson
+except ImportError:
+    orjson = None
 
 # Load environment variables from .env file
-dotenv_path = os.path.join(os.path.dirname(__file__), '.env')
-if os.path.exists(dotenv_path):
-    load_dotenv(dotenv_path)
-    print(f"Loaded environment variables from {dotenv_path}")
-else:
-    print(f"Warning: .env file not found at {dotenv_path}")
+load_env(os.path.join(os.path.dirname(__file__), '.env'))
 
 # Set up logging
-logging.basicConfig(level=logging.INFO)
+setup_logging(logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Check for required environment variables
@@ -55,92 +64,243 @@ authed = Authed.initialize(
     public_key=os.getenv("AUTHED_PUBLIC_KEY")
 )
 
+# Prebuilt 401 responses for the Authed middleware's reject paths
+def _build_401(body: bytes) -> Tuple[List[Tuple[bytes, bytes]], bytes]:
+    """Build the raw ASGI headers and body of a 401 JSON response."""
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+    ]
+    return headers, body
+
+async def _send_401(send: Send, response: Tuple[List[Tuple[bytes, bytes]], bytes]) -> None:
+    """Send a prebuilt 401 response straight over ASGI."""
+    headers, body = response
+    await send({"type": "http.response.start", "status": 401, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+_401_MISSING_AUTH = _build_401(b'{"error": "Unauthorized - Missing Authorization header"}')
+_401_INVALID_AUTH = _build_401(b'{"error": "Unauthorized - Invalid authentication"}')
+
+# Lifetime of a verified SSE session whose token has no readable exp claim
+TOKEN_DEFAULT_TTL = 60.0
+
+def _auth_header(scope: Scope) -> Optional[bytes]:
+    """Pull the raw Authorization header off the scope."""
+    # ASGI servers hand header names over lowercased, so compare bytes directly
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            return value
+    return None
+
+def _json_dumps(value: Any) -> bytes:
+    """Encode a value as compact JSON."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":")).encode()
+
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+def _token_ttl(auth_header: bytes) -> float:
+    """Seconds until the bearer token's exp claim, or a default if it cannot be read."""
+    try:
+        payload = auth_header.split(b" ", 1)[-1].split(b".")[1]
+        claims = _json_loads(base64.urlsafe_b64decode(payload + b"=" * (-len(payload) % 4)))
+        return float(claims["exp"]) - time.time()
+    except (IndexError, KeyError, TypeError, ValueError):
+        return TOKEN_DEFAULT_TTL
+
+# SSE session IDs whose stream was opened by an authenticated request, mapped to
+# the monotonic time at which that request's token expires. The MCP transport
+# only hands a session ID to the client that opened the stream, so message POSTs
+# carrying a live one are already bound to verified credentials.
+_verified_sessions: Dict[str, float] = {}
+_SESSION_ID_RE = re.compile(rb"session_id=([0-9a-f]{32})")
+
+def _session_id(scope: Scope) -> Optional[str]:
+    """Return the session_id query parameter of a request, if any."""
+    # Scan the raw query string rather than parsing it into a dict; session IDs
+    # are plain hex, so no percent-decoding is needed. The last occurrence wins,
+    # matching the query params the MCP transport routes the message with.
+    session_id = None
+    for param in scope["query_string"].split(b"&"):
+        if param.startswith(b"session_id="):
+            session_id = param[len(b"session_id="):].decode("latin-1")
+    return session_id
+
+def _session_verified(session_id: Optional[str]) -> bool:
+    """Check whether a session was opened with credentials that have not yet expired."""
+    expires_at = _verified_sessions.get(session_id)
+    if expires_at is None:
+        return False
+    if time.monotonic() >= expires_at:
+        # Expired tokens go back through full verification
+        _verified_sessions.pop(session_id, None)
+        return False
+    return True
+
+async def _verify_request(scope: Scope) -> bool:
+    """Verify a request against the Authed registry."""
+    # Every request carries a fresh DPoP proof, so results are never reused:
+    # a repeated proof is a replay and must reach the SDK's checks
+    headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+    
+    # Use the SDK's verify_request method - this is the proper way to verify
+    # a request using the Authed SDK, exactly as in the fastapi.py decorator
+    return await authed.auth.verify_request(scope["method"], str(URL(scope=scope)), headers)
+
 # Create a custom middleware for Authed authentication
-class AuthedAuthMiddleware(BaseHTTPMiddleware):
-    """Middleware that verifies Authed authentication for all requests using SDK."""
+class AuthedAuthMiddleware:
+    """Pure ASGI middleware that verifies Authed authentication for all requests using SDK."""
     
-    async def dispatch(self, request: StarletteRequest, call_next: Callable) -> StarletteResponse:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # Only HTTP requests carry credentials; let lifespan events through
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
         # Skip auth for OPTIONS requests (CORS preflight)
-        if request.method == "OPTIONS":
-            return await call_next(request)
-            
-        logger.debug(f"Verifying request to {request.url.path}")
-        logger.debug(f"Request method: {request.method}")
-        logger.debug(f"Request URL: {request.url}")
-        logger.debug(f"Request headers: {dict(request.headers)}")
+        if scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        
+        # Messages for an SSE session that was verified when it was opened
+        if scope["path"].startswith("/messages/") and _session_verified(_session_id(scope)):
+            await self.app(scope, receive, send)
+            return
+        
+        # Only pay for dumping the request when debug logging is on
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Verifying request to %s", scope["path"])
+            logger.debug("Request method: %s", scope["method"])
+            logger.debug("Request URL: %s", URL(scope=scope))
+            logger.debug("Request headers: %s", dict(Headers(scope=scope)))
         
         # Check for Authorization header
-        auth_header = request.headers.get("Authorization")
+        auth_header = _auth_header(scope)
         if not auth_header:
             logger.warning("Request missing Authorization header")
-            return StarletteResponse(
-                content=json.dumps({"error": "Unauthorized - Missing Authorization header"}),
-                status_code=401,
-                headers={"Content-Type": "application/json"}
-            )
-        
-        # Get auth handler from Authed SDK
-        auth_handler = authed.auth
+            await _send_401(send, _401_MISSING_AUTH)
+            return
         
         try:
-            # Use the SDK's verify_request method - this is the proper way to verify
-            # a request using the Authed SDK, exactly as in the fastapi.py decorator
-            is_valid = await auth_handler.verify_request(
-                request.method,
-                str(request.url),
-                dict(request.headers)
-            )
-            
-            if not is_valid:
-                logger.error("Request verification failed")
-                return StarletteResponse(
-                    content=json.dumps({"error": "Unauthorized - Invalid authentication"}),
-                    status_code=401,
-                    headers={"Content-Type": "application/json"}
-                )
-            
-            # Add auth info to request state
-            request.state.authenticated = True
-            logger.info(f"Authentication successful for {request.url.path}")
-            
-            # Call the next middleware or endpoint
-            return await call_next(request)
-            
+            is_valid = await _verify_request(scope)
         except Exception as e:
             # Handle authentication errors
-            logger.error(f"Authentication error: {str(e)}")
-            return StarletteResponse(
-                content=json.dumps({"error": f"Authentication failed: {str(e)}"}),
-                status_code=401,
-                headers={"Content-Type": "application/json"}
-            )
+            logger.error("Authentication error: %s", e)
+            await _send_401(send, _build_401(_json_dumps({"error": f"Authentication failed: {e}"})))
+            return
+        
+        if not is_valid:
+            logger.error("Request verification failed")
+            await _send_401(send, _401_INVALID_AUTH)
+            return
+        
+        # Add auth info to request state
+        scope.setdefault("state", {})["authenticated"] = True
+        logger.info("Authentication successful for %s", scope["path"])
+        
+        # Call the next middleware or endpoint
+        await self.app(scope, receive, send)
+
+# On-demand request profiling, for diagnosing hot paths outside production
+PROFILING_ENABLED = os.getenv("MCP_PROFILE") == "1"
+
+class ProfilingMiddleware(BaseHTTPMiddleware):
+    """Middleware that profiles a request with pyinstrument when it carries ?profile=1."""
+    
+    async def dispatch(self, request: StarletteRequest, call_next: Callable) -> StarletteResponse:
+        if not request.query_params.get("profile"):
+            return await call_next(request)
+        
+        from pyinstrument import Profiler
+        
+        profiler = Profiler(async_mode="enabled")
+        profiler.start()
+        response = await call_next(request)
+        profiler.stop()
+        # Rejected requests, such as failed authentication, get their own response
+        if response.status_code >= 400:
+            return response
+        return HTMLResponse(profiler.output_html())
 
 try:
     # Initialize FastMCP server
     logger.info("Initializing FastMCP server...")
     mcp = FastMCP("op-service")
     
-    # Initialize the 1Password client
-    logger.info("Initializing 1Password client...")
-    op_client = OnePasswordClient()
+    # The 1Password client is created and connected on first use, or
+    # warmed up in the background by main() while the server starts
+    _op_client: Optional[OnePasswordClient] = None
+    _op_lock = asyncio.Lock()
+    # Keeps a reference to the warm-up task so it is not garbage collected
+    _connect_task: Optional[asyncio.Task] = None
+    
+    async def get_op_client() -> OnePasswordClient:
+        """Return the shared 1Password client, connecting it on first use."""
+        global _op_client
+        if _op_client is None:
+            # Callers arriving during the background warm-up wait on the lock
+            # it holds and then reuse its client rather than connecting again
+            async with _op_lock:
+                if _op_client is None:
+                    logger.info("Initializing 1Password client...")
+                    client = OnePasswordClient()
+                    await client.connect()
+                    _op_client = client
+        return _op_client
+    
+    async def warm_up_op_client() -> None:
+        """Connect the shared 1Password client and preload its vault index."""
+        client = await get_op_client()
+        await client.warm_up()
+    
+    def _json_content(value: Any) -> TextContent:
+        """Encode a tool result as one compact JSON text block."""
+        # FastMCP would otherwise emit one JSON block per list element
+        return TextContent(type="text", text=_json_dumps(value).decode())
     
     @mcp.tool()
-    async def onepassword_list_vaults() -> List[Dict[str, str]]:
+    async def onepassword_list_vaults() -> TextContent:
         """List all available 1Password vaults"""
         logger.info("Tool called: onepassword_list_vaults")
-        return await op_client.list_vaults()
+        client = await get_op_client()
+        return _json_content(await client.list_vaults())
     
     @mcp.tool()
-    async def onepassword_list_items(vault_id: str) -> List[Dict[str, str]]:
+    async def onepassword_list_items(vault_id: str) -> TextContent:
         """List all items in a 1Password vault"""
-        logger.info(f"Tool called: onepassword_list_items(vault_id={vault_id})")
-        return await op_client.list_items(vault_id)
+        logger.info("Tool called: onepassword_list_items(vault_id=%s)", vault_id)
+        client = await get_op_client()
+        return _json_content(await client.list_items(vault_id))
+    
+    @mcp.tool()
+    async def onepassword_list_all_items() -> TextContent:
+        """List all 1Password vaults together with their items"""
+        logger.info("Tool called: onepassword_list_all_items")
+        client = await get_op_client()
+        return _json_content(await client.list_all_items())
     
     @mcp.tool()
     async def onepassword_get_secret(vault_id: str, item_id: str, field_name: Optional[str] = "credential") -> Any:
         """Get a secret from 1Password"""
-        logger.info(f"Tool called: onepassword_get_secret(vault_id={vault_id}, item_id={item_id}, field_name={field_name})")
-        return await op_client.get_secret(vault_id, item_id, field_name)
+        logger.info("Tool called: onepassword_get_secret(vault_id=%s, item_id=%s, field_name=%s)", vault_id, item_id, field_name)
+        client = await get_op_client()
+        return await client.get_secret(vault_id, item_id, field_name)
+    
+    @mcp.tool()
+    async def onepassword_get_secrets(refs: List[Dict[str, str]]) -> TextContent:
+        """Get several secrets from 1Password in one request"""
+        logger.info("Tool called: onepassword_get_secrets(count=%d)", len(refs))
+        client = await get_op_client()
+        # One JSON list, so an empty secret cannot shift the positions of the others
+        return _json_content(await client.get_secrets([
+            (ref["vault_id"], ref["item_id"], ref.get("field_name") or "credential")
+            for ref in refs
+        ]))
     
     # Get the underlying MCP server
     logger.info("Setting up MCP server...")
@@ -151,25 +311,48 @@ try:
         """Create a Starlette application with SSE transport and Authed protection."""
         sse = SseServerTransport("/messages/")
         
+        # Initialization options are static, so build them once rather than per connection
+        init_options = mcp_server.create_initialization_options()
+        
         async def handle_sse(request: StarletteRequest) -> None:
             # This is where SSE connections are handled
-            logger.info(f"SSE connection request from: {request.client}")
+            logger.info("SSE connection request from: %s", request.client)
+            session_ids = []
+            auth_header = _auth_header(request.scope)
+            expires_at = time.monotonic() + _token_ttl(auth_header or b"")
             
-            async with sse.connect_sse(
-                request.scope,
-                request.receive,
-                request._send,  # type: ignore
-            ) as (read_stream, write_stream):
-                await mcp_server.run(
-                    read_stream,
-                    write_stream,
-                    mcp_server.create_initialization_options(),
-                )
+            async def send(message: Dict[str, Any]) -> None:
+                # Pick the session ID out of the endpoint event sent to the client
+                if not session_ids and message["type"] == "http.response.body":
+                    match = _SESSION_ID_RE.search(message.get("body", b""))
+                    if match:
+                        session_ids.append(match.group(1).decode())
+                        _verified_sessions[session_ids[0]] = expires_at
+                await request._send(message)  # type: ignore
+            
+            try:
+                async with sse.connect_sse(
+                    request.scope,
+                    request.receive,
+                    send,
+                ) as (read_stream, write_stream):
+                    await mcp_server.run(
+                        read_stream,
+                        write_stream,
+                        init_options,
+                    )
+            finally:
+                if session_ids:
+                    _verified_sessions.pop(session_ids[0], None)
         
         # Set up middleware with Authed authentication
         middleware = [
             Middleware(AuthedAuthMiddleware),
         ]
+        if PROFILING_ENABLED:
+            # Outermost, so the profile includes Authed verification; rejected
+            # requests still get their own response rather than a profile
+            middleware.insert(0, Middleware(ProfilingMiddleware))
         
         # Create the app with the proper routes and middleware
         app = Starlette(
@@ -185,6 +368,8 @@ try:
     
     # Create a FastAPI app with Authed protection for REST endpoints
     fastapi_app = FastAPI()
+    if PROFILING_ENABLED:
+        fastapi_app.add_middleware(ProfilingMiddleware)
     
     @fastapi_app.get("/health")
     async def health_check():
@@ -197,28 +382,59 @@ try:
         """A protected endpoint to verify Authed authentication."""
         return {"status": "ok", "message": "Authentication successful"}
     
-except Exception as e:
-    logger.error(f"Error during initialization: {str(e)}")
+except Exception:
+    logger.exception("Error during initialization")
     import sys
     sys.exit(1)
 
+def _log_connect_result(task: asyncio.Task) -> None:
+    """Report the outcome of the background 1Password connection."""
+    if task.cancelled():
+        return
+    if task.exception() is not None:
+        logger.error("Background connection to 1Password failed: %s", task.exception())
+    else:
+        logger.info("Successfully connected to 1Password")
+
+async def main():
+    """Serve the app and connect to 1Password in a single asyncio event loop."""
+    import uvicorn
+    
+    global _connect_task
+    
+    # Connect to 1Password in the background so the server can start accepting
+    # connections straight away; the first tool call waits for it if needed
+    logger.info("Connecting to 1Password in the background...")
+    _connect_task = asyncio.create_task(warm_up_op_client())
+    _connect_task.add_done_callback(_log_connect_result)
+    
+    # Create the Starlette app with Authed protection
+    logger.info("Creating Starlette app with Authed authentication...")
+    app = create_app(debug=True)
+    
+    # Run the server
+    logger.info("Starting the server...")
+    port = int(os.getenv("PORT", "8000"))
+    # uvicorn picks the httptools parser when it is installed. Only one worker, since
+    # SSE sessions live in this process's memory. Without uvicorn's own log config
+    # its loggers propagate to the queued root handler.
+    server = uvicorn.Server(uvicorn.Config(app, host="0.0.0.0", port=port, log_config=None))
+    await server.serve()
+
+def run(coro) -> None:
+    """Run a coroutine on uvloop when it is installed, falling back to asyncio."""
+    try:
+        from uvloop import run as uvloop_run
+    except ImportError:
+        # Not installed, or older than uvloop 0.18, which added run()
+        asyncio.run(coro)
+    else:
+        uvloop_run(coro)
+
 if __name__ == "__main__":
     try:
-        # Connect to 1Password
-        logger.info("Connecting to 1Password...")
-        asyncio.run(op_client.connect())
-        logger.info("Successfully connected to 1Password")
-        
-        # Create the Starlette app with Authed protection
-        logger.info("Creating Starlette app with Authed authentication...")
-        app = create_app(debug=True)
-        
-        # Run the server
-        logger.info("Starting the server...")
-        port = int(os.getenv("PORT", "8000"))
-        uvicorn.run(app, host="0.0.0.0", port=port)
-    except Exception as e:
-        logger.error(f"Error running the server: {str(e)}")
+        run(main())
+    except Exception:
+        logger.exception("Error running the server")
         import sys
         sys.exit(1)
-   
\ No newline at end of file